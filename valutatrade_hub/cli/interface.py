@@ -1,14 +1,104 @@
 import argparse
-from typing import Optional
-
-from ..core.currencies import get_all_currencies
+import functools
+import heapq
+import math
+import os
+import shlex
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from ..core.currencies import FiatCurrency, get_all_currencies
 from ..core.exceptions import CurrencyNotFoundError, InsufficientFundsError
 from ..core.models import User
 from ..core.usecases import PortfolioManager, UserManager
 from ..core.utils import DataManager, ExchangeRateService
-from ..parser_service.config import ParserConfig
-from ..parser_service.storage import RatesStorage
-from ..parser_service.updater import RatesUpdater
+
+_RATES_CACHE_TTL = 60
+
+_NOT_LOGGED_IN = "Error: Please login first"
+_WALLET_BASE = "  - %s: %.2f → %.2f %s"
+_WALLET_RATE = "  - %s: %.4f → %.2f %s (rate: %.4f)"
+_WALLET_NO_RATE = "  - %s: %.4f → rate unavailable"
+_BALANCE_CHANGE = "  - {currency}: was {old_balance:.4f} → now {new_balance:.4f}"
+
+
+@functools.lru_cache(maxsize=1)
+def _partition_currencies():
+    """делит реестр валют на фиатные и криптовалюты"""
+    fiats = []
+    cryptos = []
+
+    for currency in get_all_currencies().values():
+        if isinstance(currency, FiatCurrency):
+            fiats.append(currency)
+        else:
+            cryptos.append(currency)
+
+    return tuple(fiats), tuple(cryptos)
+
+
+def _write_lines(lines: List[str]):
+    """выводит строки одной записью в stdout"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _rate_key(item) -> float:
+    """ключ сортировки пары по курсу"""
+    return item[1]["rate"]
+
+
+class _CachedRates:
+    """кэш rates.json в рамках сессии CLI (TTL + проверка mtime)"""
+
+    def __init__(
+        self, loader: Callable[[], dict], path: str,
+        ttl_seconds: float = _RATES_CACHE_TTL
+    ):
+        self._loader = loader
+        self._path = path
+        self._ttl = ttl_seconds
+        self._loaded_at = 0.0
+        self._mtime: Optional[float] = None
+        self._data: Optional[dict] = None
+        self._by_currency: Optional[Dict[str, List[str]]] = None
+
+    def get(self) -> dict:
+        """возвращает курсы, перечитывая файл только при изменении"""
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except OSError:
+            mtime = None
+
+        now = time.monotonic()
+        if (self._data is None or mtime != self._mtime
+                or now - self._loaded_at > self._ttl):
+            self._data = self._loader()
+            self._by_currency = None
+            self._mtime = mtime
+            self._loaded_at = now
+
+        return self._data
+
+    def by_currency(self, data: dict) -> Dict[str, List[str]]:
+        """индекс валюта -> ключи пар для данных, полученных из get()"""
+        if data is self._data and self._by_currency is not None:
+            return self._by_currency
+
+        index: Dict[str, List[str]] = {}
+        for pair in data.get("pairs", {}):
+            from_currency, _, to_currency = pair.partition("_")
+            index.setdefault(from_currency, []).append(pair)
+            if to_currency != from_currency:
+                index.setdefault(to_currency, []).append(pair)
+
+        if data is self._data:
+            self._by_currency = index
+        return index
+
+    def invalidate(self):
+        """сбрасывает кэш"""
+        self._data = None
 
 
 class CLIInterface:
@@ -19,8 +109,25 @@ class CLIInterface:
         self.portfolio_manager = PortfolioManager(
             self.data_manager, self.rate_service)
         self.current_user: Optional[User] = None
-        self.rates_updater = RatesUpdater()
-        self.rates_storage = RatesStorage(ParserConfig())
+        self._rates_updater = None
+        self._cached_rates = _CachedRates(
+            self.rate_service.get_rates,
+            os.path.join(self.data_manager.data_dir, "rates.json"))
+        self._commands = self._build_commands()
+
+    def _require_login(self) -> bool:
+        """проверяет, что пользователь вошел в систему"""
+        if not self.current_user:
+            print(_NOT_LOGGED_IN)
+            return False
+        return True
+
+    def _get_rates_updater(self):
+        """создает RatesUpdater при первом обращении"""
+        if self._rates_updater is None:
+            from ..parser_service.updater import RatesUpdater
+            self._rates_updater = RatesUpdater()
+        return self._rates_updater
 
     def register(self, args):
         """register - создать нового пользователя"""
@@ -43,56 +150,58 @@ class CLIInterface:
 
     def show_portfolio(self, args):
         """show-portfolio - показать портфель"""
-        if not self.current_user:
-            print("Error: Please login first")
+        if not self._require_login():
             return
 
         try:
             portfolio = self.portfolio_manager.get_user_portfolio(
                 self.current_user.user_id)
 
-            base_currency = args.base.upper() if args.base else 'USD'
+            base_currency = args.base or 'USD'
 
-            print(f"Portfolio of user '{self.current_user.username}' "
-                  f"(base: {base_currency}):")
+            lines = [f"Portfolio of user '{self.current_user.username}' "
+                     f"(base: {base_currency}):"]
 
             if not portfolio.wallets:
-                print("  Portfolio is empty")
+                lines.append("  Portfolio is empty")
+                _write_lines(lines)
                 return
 
-            total_value = 0.0
+            rates_to_base = self.rate_service.get_rates_for_base(
+                base_currency, self._cached_rates.get())
+            values: List[float] = []
 
             for currency_code, wallet in portfolio.wallets.items():
                 balance = wallet.balance
 
                 if currency_code == base_currency:
                     value = balance
-                    print(f"  - {currency_code}: "
-                          f"{balance:.2f} → {value:.2f} {base_currency}")
+                    lines.append(_WALLET_BASE % (
+                        currency_code, balance, value, base_currency))
                 else:
-                    rate = self.rate_service.get_rate(
-                        currency_code, base_currency)
+                    rate = rates_to_base.get(currency_code)
                     if rate:
                         value = balance * rate
-                        print(
-                            f"  - {currency_code}: {balance:.4f} → "
-                            f"{value:.2f} {base_currency} (rate: {rate:.4f})")
+                        lines.append(_WALLET_RATE % (
+                            currency_code, balance, value, base_currency,
+                            rate))
                     else:
                         value = 0
-                        print(f"  - {currency_code}: {balance:.4f}"
-                              " → rate unavailable")
+                        lines.append(_WALLET_NO_RATE % (
+                            currency_code, balance))
 
-                total_value += value
+                values.append(value)
 
-            print(f"TOTAL: {total_value:,.2f} {base_currency}")
+            total_value = math.fsum(values)
+            lines.append(f"TOTAL: {total_value:,.2f} {base_currency}")
+            _write_lines(lines)
 
         except Exception as e:
             print(f"Error getting portfolio: {e}")
 
     def buy(self, args):
         """buy - купить валюту"""
-        if not self.current_user:
-            print("Error: Please login first")
+        if not self._require_login():
             return
 
         try:
@@ -113,16 +222,14 @@ class CLIInterface:
                         f"Estimated cost: {result['estimated_cost']:,.2f} USD")
 
             print("Portfolio changes:")
-            print(f"  - {result['currency']}: was {result['old_balance']:.4f}"
-                  f" → now {result['new_balance']:.4f}")
+            print(_BALANCE_CHANGE.format_map(result))
 
         except (CurrencyNotFoundError, ValueError) as e:
             print(f"Error: {e}")
 
     def sell(self, args):
         """sell - продать валюту"""
-        if not self.current_user:
-            print("Error: Please login first")
+        if not self._require_login():
             return
 
         try:
@@ -140,7 +247,7 @@ class CLIInterface:
                     print(f"Estimated revenue: {result['estimated_revenue']:,.2f} USD")
 
             print("Portfolio changes:")
-            print(f"  - {result['currency']}: was {result['old_balance']:.4f} → now {result['new_balance']:.4f}")
+            print(_BALANCE_CHANGE.format_map(result))
 
         except (CurrencyNotFoundError, InsufficientFundsError, ValueError) as e:
             print(f"Error: {e}")
@@ -148,13 +255,14 @@ class CLIInterface:
     def get_rate(self, args):
         """get-rate - получить курс валюты"""
         try:
-            from_currency = args.from_currency.upper()
-            to_currency = args.to_currency.upper()
+            from_currency = args.from_currency
+            to_currency = args.to_currency
 
-            rate = self.rate_service.get_rate(from_currency, to_currency)
+            rates = self._cached_rates.get()
+            rate = self.rate_service.get_rate(
+                from_currency, to_currency, rates)
 
             if rate:
-                rates = self.rate_service.get_rates()
                 updated_at = rates.get("last_refresh", "unknown")
 
                 print(f"Rate {from_currency}→{to_currency}: {rate:.6f} (updated: {updated_at})")
@@ -169,40 +277,32 @@ class CLIInterface:
 
     def list_currencies(self, args):
         """list-currencies - показать список валют"""
-        currencies = get_all_currencies()
-
-        print("Supported currencies:")
-        print("-" * 80)
-
-        fiats = []
-        cryptos = []
+        fiats, cryptos = _partition_currencies()
 
-        for currency in currencies.values():
-            if hasattr(currency, 'issuing_country'):
-                fiats.append(currency)
-            else:
-                cryptos.append(currency)
+        lines = ["Supported currencies:", "-" * 80]
 
         if fiats:
-            print("\nFiat currencies:")
+            lines.append("\nFiat currencies:")
             for currency in fiats:
-                print(f"  {currency.get_display_info()}")
+                lines.append(f"  {currency.get_display_info()}")
 
         if cryptos:
-            print("\nCryptocurrencies:")
+            lines.append("\nCryptocurrencies:")
             for currency in cryptos:
-                print(f"  {currency.get_display_info()}")
+                lines.append(f"  {currency.get_display_info()}")
+
+        _write_lines(lines)
 
     def update_rates(self, args):
         """update-rates - обновление курсов валют"""
         try:
-            source = args.source.lower() if args.source else None
-            rates = self.rates_updater.run_update(source)
+            rates = self._get_rates_updater().run_update(args.source)
 
             if rates:
+                self._cached_rates.invalidate()
                 print(f"Update successful. Total rates updated: {len(rates)}")
 
-                current_data = self.rates_storage.load_current_rates()
+                current_data = self._cached_rates.get()
                 if current_data.get("last_refresh"):
                     print(f"Last refresh: {current_data['last_refresh']}")
             else:
@@ -213,7 +313,7 @@ class CLIInterface:
     def show_rates(self, args):
         """show-rates - показать курсы из кэша"""
         try:
-            current_data = self.rates_storage.load_current_rates()
+            current_data = self._cached_rates.get()
 
             if not current_data.get("pairs"):
                 print("Local rates cache is empty. Run 'update-rates' to load data.")
@@ -223,30 +323,33 @@ class CLIInterface:
             filtered_pairs = {}
 
             if args.currency:
-                currency = args.currency.upper()
-                for pair, data in pairs.items():
-                    if pair.startswith(currency + "_") or pair.endswith("_" + currency):
-                        filtered_pairs[pair] = data
+                by_currency = self._cached_rates.by_currency(current_data)
+                for pair in by_currency.get(args.currency, []):
+                    filtered_pairs[pair] = pairs[pair]
             else:
                 filtered_pairs = pairs
 
-            sorted_pairs = sorted(filtered_pairs.items(), 
-                                key=lambda x: x[1]["rate"], 
-                                reverse=True)
+            if args.top and 0 < args.top < len(filtered_pairs) // 2:
+                sorted_pairs = heapq.nlargest(
+                    args.top, filtered_pairs.items(), key=_rate_key)
+            else:
+                sorted_pairs = sorted(filtered_pairs.items(),
+                                      key=_rate_key,
+                                      reverse=True)
 
-            if args.top:
-                sorted_pairs = sorted_pairs[:args.top]
+                if args.top:
+                    sorted_pairs = sorted_pairs[:args.top]
 
-            print(f"Rates from cache (updated at {current_data.get('last_refresh', 'unknown')}):")
+            lines = [f"Rates from cache (updated at {current_data.get('last_refresh', 'unknown')}):"]
             for pair, data in sorted_pairs:
-                print(f"- {pair}: {data['rate']} (source: {data.get('source', 'unknown')})")
+                lines.append(f"- {pair}: {data['rate']} (source: {data.get('source', 'unknown')})")
+            _write_lines(lines)
 
         except Exception as e:
             print(f"Error showing rates: {e}")   
 
     def _parse_input(self, user_input: str):
         """парсинг ввода пользователя в аргументы"""
-        import shlex
         try:
             parts = shlex.split(user_input)
             if not parts:
@@ -255,68 +358,82 @@ class CLIInterface:
             command = parts[0]
             args_list = parts[1:]
 
-            parser = self._create_parser_for_command(command)
-            if not parser:
+            if command not in self._commands:
                 return None
 
-            return parser.parse_args(args_list)
+            parser, handler = self._commands[command]
+            return handler, parser.parse_args(args_list)
         except (ValueError, SystemExit):
             return None
 
-    def _create_parser_for_command(self, command: str):
-        """парсинг для конкретной команды"""
-        parser = argparse.ArgumentParser(prog=command, add_help=False)
-
-        if command == "register":
-            parser.add_argument('--username', required=True)
-            parser.add_argument('--password', required=True)
-        elif command == "login":
-            parser.add_argument('--username', required=True)
-            parser.add_argument('--password', required=True)
-        elif command == "show-portfolio":
-            parser.add_argument('--base', required=False)
-        elif command == "buy":
-            parser.add_argument('--currency', required=True)
-            parser.add_argument('--amount', type=float, required=True)
-        elif command == "sell":
-            parser.add_argument('--currency', required=True)
-            parser.add_argument('--amount', type=float, required=True)
-        elif command == "get-rate":
-            parser.add_argument('--from', dest='from_currency', required=True)
-            parser.add_argument('--to', dest='to_currency', required=True)
-        elif command == "update-rates":
-            parser.add_argument('--source', required=False)
-        elif command == "show-rates":
-            parser.add_argument('--currency', required=False)
-            parser.add_argument('--top', type=int, required=False)
-            parser.add_argument('--base', required=False)
-        elif command == "list-currencies":
-            pass
-        else:
-            return None
+    def _build_commands(self):
+        """создает таблицу команд: парсер и обработчик для каждой"""
+        commands = {}
+
+        def new_parser(command: str, handler):
+            parser = argparse.ArgumentParser(prog=command, add_help=False)
+            commands[command] = (parser, handler)
+            return parser
 
-        return parser
+        parser = new_parser("register", self.register)
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+
+        parser = new_parser("login", self.login)
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+
+        parser = new_parser("show-portfolio", self.show_portfolio)
+        parser.add_argument('--base', type=str.upper, required=False)
+
+        parser = new_parser("buy", self.buy)
+        parser.add_argument('--currency', type=str.upper, required=True)
+        parser.add_argument('--amount', type=float, required=True)
+
+        parser = new_parser("sell", self.sell)
+        parser.add_argument('--currency', type=str.upper, required=True)
+        parser.add_argument('--amount', type=float, required=True)
+
+        parser = new_parser("get-rate", self.get_rate)
+        parser.add_argument(
+            '--from', dest='from_currency', type=str.upper, required=True)
+        parser.add_argument(
+            '--to', dest='to_currency', type=str.upper, required=True)
+
+        parser = new_parser("update-rates", self.update_rates)
+        parser.add_argument('--source', type=str.lower, required=False)
+
+        parser = new_parser("show-rates", self.show_rates)
+        parser.add_argument('--currency', type=str.upper, required=False)
+        parser.add_argument('--top', type=int, required=False)
+        parser.add_argument('--base', type=str.upper, required=False)
+
+        new_parser("list-currencies", self.list_currencies)
+
+        return commands
 
     def _print_help(self):
         """справочная информация по командам"""
-        print("\nAvailable commands:")
-        print("  register --username <username> --password <password>")
-        print("  login --username <username> --password <password>")
-        print("  show-portfolio [--base <currency>]")
-        print("  buy --currency <code> --amount <amount>")
-        print("  sell --currency <code> --amount <amount>")
-        print("  get-rate --from <currency> --to <currency>")
-        print("  update-rates [--source <coingecko|exchangerate>]")
-        print("  show-rates [--currency <code>] [--top <N>] [--base <currency>]")
-        print("  list-currencies")
-        print("  help")
-        print("  exit")
-        print("\nExamples:")
-        print("  register --username alice --password 1234")
-        print("  buy --currency BTC --amount 0.05")
-        print("  get-rate --from USD --to BTC")
-        print("  update-rates --source coingecko")
-        print("  show-rates --top 3")
+        _write_lines([
+            "\nAvailable commands:",
+            "  register --username <username> --password <password>",
+            "  login --username <username> --password <password>",
+            "  show-portfolio [--base <currency>]",
+            "  buy --currency <code> --amount <amount>",
+            "  sell --currency <code> --amount <amount>",
+            "  get-rate --from <currency> --to <currency>",
+            "  update-rates [--source <coingecko|exchangerate>]",
+            "  show-rates [--currency <code>] [--top <N>] [--base <currency>]",
+            "  list-currencies",
+            "  help",
+            "  exit",
+            "\nExamples:",
+            "  register --username alice --password 1234",
+            "  buy --currency BTC --amount 0.05",
+            "  get-rate --from USD --to BTC",
+            "  update-rates --source coingecko",
+            "  show-rates --top 3",
+        ])
 
     def run(self):
         """запуск интерфейса"""
@@ -342,20 +459,14 @@ class CLIInterface:
                     self._print_help()
                     continue
 
-                args = self._parse_input(user_input)
-                if not args:
+                parsed = self._parse_input(user_input)
+                if not parsed:
                     print(f"Unknown command or invalid arguments: {user_input}")
                     print("Type 'help' for available commands")
                     continue
 
-                command_parts = user_input.split()
-                command = command_parts[0].replace('-', '_')
-
-                if hasattr(self, command):
-                    command_method = getattr(self, command)
-                    command_method(args)
-                else:
-                    print(f"Unknown command: {command_parts[0]}")
+                command_method, args = parsed
+                command_method(args)
 
             except KeyboardInterrupt:
                 print("\n\nGoodbye!")
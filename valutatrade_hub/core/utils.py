@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class DataManager:
@@ -55,29 +55,82 @@ class ExchangeRateService:
             return {"pairs": {}, "last_refresh": None}
         return rates
 
-    def get_rate(self, from_currency: str, to_currency: str) -> float:
+    def get_rate(
+        self, from_currency: str, to_currency: str,
+        rates: Optional[Dict] = None
+    ) -> float:
         """получает обменный курс из актуальных данных"""
         if from_currency == to_currency:
             return 1.0
 
-        rates = self.get_rates()
+        if rates is None:
+            rates = self.get_rates()
+
+        pairs = rates.get("pairs", {})
 
-        rate_key = f"{from_currency}_{to_currency}"
-        if rate_key in rates.get("pairs", {}):
-            return rates["pairs"][rate_key]["rate"]
+        rate = self._pair_rate(pairs, f"{from_currency}_{to_currency}")
+        if rate:
+            return rate
 
-        reverse_key = f"{to_currency}_{from_currency}"
-        if reverse_key in rates.get("pairs", {}):
-            return 1.0 / rates["pairs"][reverse_key]["rate"]
+        reverse_rate = self._pair_rate(
+            pairs, f"{to_currency}_{from_currency}")
+        if reverse_rate:
+            return 1.0 / reverse_rate
 
         if from_currency != "USD" and to_currency != "USD":
-            usd_from = self.get_rate(from_currency, "USD")
-            usd_to = self.get_rate(to_currency, "USD")
+            usd_from = self.get_rate(from_currency, "USD", rates)
+            usd_to = self.get_rate(to_currency, "USD", rates)
             if usd_from and usd_to:
                 return usd_from / usd_to
 
         return None
 
+    def get_rates_for_base(
+        self, base_currency: str, rates: Optional[Dict] = None
+    ) -> Dict[str, float]:
+        """курсы всех валют к базовой за одно чтение rates.json"""
+        if rates is None:
+            rates = self.get_rates()
+        pairs = rates.get("pairs", {})
+
+        rates_to_base = self._collect_rates(pairs, base_currency)
+        rates_to_base[base_currency] = 1.0
+
+        if base_currency != "USD":
+            rates_to_usd = self._collect_rates(pairs, "USD")
+            base_to_usd = rates_to_usd.get(base_currency)
+            if base_to_usd:
+                for code, usd_rate in rates_to_usd.items():
+                    if usd_rate:
+                        rates_to_base.setdefault(
+                            code, usd_rate / base_to_usd)
+
+        return rates_to_base
+
+    @staticmethod
+    def _pair_rate(pairs: Dict, pair: str) -> Optional[float]:
+        """курс пары или None, если пары нет или курс пустой"""
+        return pairs.get(pair, {}).get("rate") or None
+
+    @staticmethod
+    def _collect_rates(pairs: Dict, base_currency: str) -> Dict[str, float]:
+        """прямые и обратные курсы к базовой валюте за один проход"""
+        direct = {}
+        reverse = {}
+
+        for pair in pairs:
+            from_currency, _, to_currency = pair.partition("_")
+            rate = ExchangeRateService._pair_rate(pairs, pair)
+            if not rate:
+                continue
+            if to_currency == base_currency:
+                direct[from_currency] = rate
+            elif from_currency == base_currency:
+                reverse[to_currency] = 1.0 / rate
+
+        reverse.update(direct)
+        return reverse
+
     def is_rates_fresh(self, ttl_seconds: int = 300) -> bool:
         """проверка актуальности курсов"""
         rates = self.get_rates()